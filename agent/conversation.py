@@ -1,29 +1,38 @@
-from typing import Any
-from enum import Enum, auto
+import asyncio
+import httpx
+from collections import deque
+from typing import Any, AsyncIterator
 
-from agent.services.orders import get_order_details, format_order_info, order_status_to_readable
-from agent.utils.agent_utils import handle_early_risers_promotion, handle_other_promotion_requests, AgentUtilsMixin
+from agent.services.orders import format_order_info, order_status_to_readable
+from agent.utils.agent_utils import handle_early_risers_promotion, handle_other_promotion_requests, AgentUtilsMixin, CONVERSATION_HISTORY_MAXLEN
 from agent.utils.product_utils import ProductUtilsMixin
 from agent.utils.order_utils import OrderUtilsMixin
 
-from agent.types import AgentState
-
-class Intent(Enum):
-    """Enum to represent the different intents a user might have."""
-    NONE = auto()  # No clear intent detected
-    ORDER_STATUS = auto()  # User wants to check order status + tracking link
-    PRODUCT_RECOMMENDATIONS = auto()  # User wants product recommendations
-    PROMOTIONS = auto()  # User wants to know about promotions
-    OTHER_DISCOUNTS = auto()  # User wants to know about other discounts/promotions
+from agent.types import AgentState, Intent, INTENT_BY_LABEL
 
 class SierraAgent(AgentUtilsMixin, ProductUtilsMixin, OrderUtilsMixin):
     welcome_msg = "Welcome, I am Sierra Outfitters agent. You can ask about the status of an order, product recommendations, or potential promotions. What would you like to request?"
 
     def __init__(self):
-        self.conversation_history = []
+        # Bounded so long sessions don't grow memory without limit
+        self.conversation_history = deque(maxlen=CONVERSATION_HISTORY_MAXLEN)
+        self._last_user_message = ""
+        # Formatted "User: ..." / "Assistant: ..." lines kept in step with conversation_history
+        self._formatted_lines = deque(maxlen=CONVERSATION_HISTORY_MAXLEN)
+        # Total messages added, including any dropped from the bounded history
+        self._message_count = 0
+        # Rolling summary of the first _summarized_upto messages
+        self._summary = ""
+        self._summarized_upto = 0
+        self._summary_task = None
         self.state = AgentState.WELCOME
         self.current_intent = Intent.NONE
         self.collected_info = {}
+        # Speculative order lookup started while gathering order info
+        self._pending_order_task = None
+        self._pending_order_number = None
+        # Queue receiving response chunks while a stream_message call is active
+        self._stream_queue = None
         
     async def process_message(self, user_message: str) -> str:
         """Process user message based on current state and return response."""
@@ -34,7 +43,7 @@ class SierraAgent(AgentUtilsMixin, ProductUtilsMixin, OrderUtilsMixin):
         
         # Add user message to history (skip if empty - happens on initialization)
         if user_message:
-            self.conversation_history.append({"role": "user", "content": user_message})
+            self._add_message("user", user_message)
             
         # Process based on current state
         if self.state == AgentState.INTENT_DETECTION:
@@ -45,6 +54,31 @@ class SierraAgent(AgentUtilsMixin, ProductUtilsMixin, OrderUtilsMixin):
         # Default fallback response
         return "I'm sorry, I'm having trouble understanding. Could you please try again?"
     
+    async def stream_message(self, user_message: str) -> AsyncIterator[str]:
+        """
+        Process user message like process_message, but yield the response in chunks
+        as they become available. The full response is still added to the history.
+        """
+        queue = asyncio.Queue()
+        self._stream_queue = queue
+        task = asyncio.create_task(self.process_message(user_message))
+        # None marks the end of the stream
+        task.add_done_callback(lambda _: queue.put_nowait(None))
+        
+        emitted = False
+        try:
+            while (chunk := await queue.get()) is not None:
+                emitted = True
+                yield chunk
+            response = task.result()
+            # Responses that bypass _send_response are yielded whole
+            if not emitted:
+                yield response
+        finally:
+            self._stream_queue = None
+            if not task.done():
+                task.cancel()
+    
     async def _handle_intent_detection(self) -> str:
         """Handle the intent detection state."""
         # First, check if we might have a new intent
@@ -57,17 +91,11 @@ class SierraAgent(AgentUtilsMixin, ProductUtilsMixin, OrderUtilsMixin):
             return await self._send_response(clarification_msg, AgentState.INTENT_DETECTION)
         
         # Map string intent to enum
-        intent_mapping = {
-            "order_status": Intent.ORDER_STATUS,
-            "product_recommendations": Intent.PRODUCT_RECOMMENDATIONS,
-            "promotions": Intent.PROMOTIONS,
-            "other_discounts": Intent.OTHER_DISCOUNTS
-        }
-
-        self.current_intent = intent_mapping.get(intent_result, Intent.NONE)
+        self.current_intent = INTENT_BY_LABEL.get(intent_result, Intent.NONE)
         
         # Reset collected info for new intent
         self.collected_info = {}
+        self._cancel_order_prefetch()
         
         # Transition to the appropriate info gathering state based on intent
         if self.current_intent == Intent.ORDER_STATUS:
@@ -96,26 +124,35 @@ class SierraAgent(AgentUtilsMixin, ProductUtilsMixin, OrderUtilsMixin):
     
     async def _handle_info_gathering(self) -> str:
         """Handle gathering information based on intent."""
+        # While gathering order info, extract order details concurrently with the
+        # intent check; the extraction is discarded if the intent changed
+        extract_task = None
+        if self.current_intent == Intent.ORDER_STATUS:
+            extract_task = asyncio.create_task(self._extract_order_details_with_llm())
+        
         # First check if the user changed intent
-        intent_result = await self._detect_intent_llm()
-        intent_mapping = {
-            "order_status": Intent.ORDER_STATUS,
-            "product_recommendations": Intent.PRODUCT_RECOMMENDATIONS,
-            "promotions": Intent.PROMOTIONS
-        }
-        detected_intent = intent_mapping.get(intent_result, Intent.NONE)
+        try:
+            intent_result = await self._detect_intent_llm()
+        except BaseException:
+            if extract_task is not None:
+                extract_task.cancel()
+            raise
+        detected_intent = INTENT_BY_LABEL.get(intent_result, Intent.NONE)
         
         # If intent changed, reset and go back to intent detection
         if detected_intent != Intent.NONE and detected_intent != self.current_intent:
+            if extract_task is not None:
+                extract_task.cancel()
             self.current_intent = detected_intent
             self.collected_info = {}
+            self._cancel_order_prefetch()
             self.state = AgentState.INTENT_DETECTION
             return await self._handle_intent_detection()
         
         # Handle based on current intent
         if self.current_intent == Intent.ORDER_STATUS:
             # Use the consolidated order info gathering helper
-            return await self._handle_order_info_gathering()
+            return await self._handle_order_info_gathering(await extract_task)
             
         elif self.current_intent == Intent.PRODUCT_RECOMMENDATIONS:
             # Use the consolidated product info gathering helper
@@ -123,9 +160,7 @@ class SierraAgent(AgentUtilsMixin, ProductUtilsMixin, OrderUtilsMixin):
             
         # Default case (should not happen)
         fallback_msg = "I'm not sure what information I need. Let's start over. What would you like help with?"
-        self.conversation_history.append({"role": "assistant", "content": fallback_msg})
-        self.state = AgentState.INTENT_DETECTION
-        return fallback_msg
+        return await self._send_response(fallback_msg, AgentState.INTENT_DETECTION)
     
     async def _handle_data_retrieval(self) -> str:
         """Handle retrieving data based on collected information."""
@@ -137,7 +172,7 @@ class SierraAgent(AgentUtilsMixin, ProductUtilsMixin, OrderUtilsMixin):
                 
                 if order_number and email:
                     try:
-                        order = await get_order_details(order_number=order_number, customer_email=email)
+                        order = await self._lookup_order(order_number, email)
                         context = format_order_info(order)
                         status_text = order_status_to_readable(order["Status"])
                         tracking_info = ""
@@ -146,7 +181,7 @@ class SierraAgent(AgentUtilsMixin, ProductUtilsMixin, OrderUtilsMixin):
                             
                         response = f"Here's the information for your order {order_number}.{tracking_info} {status_text}.\n\n{context}\n\nEnjoy your outdoor apparrel! 🌄\n\nCan I help you with anything else?"
                         return await self._send_response(response, AgentState.INTENT_DETECTION)
-                    except Exception as e:
+                    except (httpx.HTTPError, ValueError, KeyError) as e:
                         error_msg = f"Sorry, I couldn't find an order with number {order_number} for email {email}. Please double check and try again."
                         # Reset collected info and stay in order info gathering
                         self.collected_info = {}
@@ -158,8 +193,8 @@ class SierraAgent(AgentUtilsMixin, ProductUtilsMixin, OrderUtilsMixin):
             else:
                 raise RuntimeError(f"Invalid state: {self.current_intent} intent should not reach DATA_RETRIEVAL state")
             
-        except Exception as e:
-            # General error handling
+        except (httpx.HTTPError, ValueError, KeyError) as e:
+            # General error handling for lookup failures
             error_msg = "I apologize, but I encountered an error while trying to retrieve your information. Let's try again. What would you like to know about?"
             return await self._send_response(error_msg, AgentState.INTENT_DETECTION)
     
\ No newline at end of file
@@ -1,2 +1,2 @@
 # Import intents to make them available
-from . import products, orders
+from . import api_client, products, orders
@@ -0,0 +1,42 @@
+import asyncio
+import httpx
+import os
+from typing import Optional
+
+# Local API base URL
+API_BASE = "http://localhost:8000"
+
+# When the agent runs in the same process as the API data, call the lookup functions
+# directly instead of going through HTTP and JSON
+IN_PROCESS_API = os.getenv("SIERRA_API_IN_PROCESS", "false").lower() in ("1", "true", "yes")
+
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def get_client() -> httpx.AsyncClient:
+    """
+    Get the shared HTTP client for the Sierra Outfitters API, creating it on first use.
+    Reusing one client keeps connections alive across order and product lookups.
+    """
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    # Connections are bound to the event loop they were opened on
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = httpx.AsyncClient(
+            base_url=API_BASE,
+            timeout=httpx.Timeout(5.0),
+            # Keep idle connections open across customer turns, which can be a while apart
+            limits=httpx.Limits(max_keepalive_connections=20, keepalive_expiry=60),
+        )
+        _client_loop = loop
+    return _client
+
+async def close_client() -> None:
+    """
+    Close the shared HTTP client, if one was created
+    """
+    global _client, _client_loop
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        _client_loop = None
@@ -1,25 +1,40 @@
 import json
 import os
-import httpx
 from typing import List, Dict, Any, Optional
 
-# Local API base URL
-API_BASE = "http://localhost:8000"
+from agent.services.api_client import get_client, IN_PROCESS_API
 
-async def search_orders(customer_email: str = None, order_number: str = None) -> List[Dict[str, Any]]:
+async def search_orders(customer_email: str = None, order_number: str = None, tracking_number: str = None) -> List[Dict[str, Any]]:
     """
     Search for orders with optional filtering
     """
+    if IN_PROCESS_API:
+        # Imported here so the API server package only loads when it is used
+        from api.routes.orders import find_orders
+        return find_orders(customer_email, order_number, tracking_number)
+
     params = {}
     if customer_email:
         params["customer_email"] = customer_email
     if order_number:
         params["order_number"] = order_number
+    if tracking_number:
+        params["tracking_number"] = tracking_number
     
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{API_BASE}/orders/", params=params)
-        response.raise_for_status()
-        return response.json()["orders"]
+    client = get_client()
+    response = await client.get("/orders/", params=params)
+    response.raise_for_status()
+    return response.json()["orders"]
+
+# Order summary shown to the customer, filled in by format_order_info
+ORDER_INFO_TEMPLATE = """
+    Order: {OrderNumber}
+    Customer: {CustomerName} ({Email})
+    Status: {status}
+    Products Ordered: {products_ordered}
+    Tracking Info: {tracking_info}
+    """
+TRACKING_INFO_TEMPLATE = "Tracking Number: {0}\nTracking Link: https://tools.usps.com/go/TrackConfirmAction?tLabels={0}"
 
 def format_order_info(order: Dict[str, Any]) -> str:
     """
@@ -28,32 +43,29 @@ def format_order_info(order: Dict[str, Any]) -> str:
     products_ordered = ", ".join(order['ProductsOrdered'])
     
     # Create tracking info with link when available
-    if order.get('TrackingNumber'):
-        tracking_url = f"https://tools.usps.com/go/TrackConfirmAction?tLabels={order['TrackingNumber']}"
-        tracking_info = f"Tracking Number: {order['TrackingNumber']}\nTracking Link: {tracking_url}"
-    else:
-        tracking_info = "No tracking number available"
+    tracking_number = order.get('TrackingNumber')
+    tracking_info = TRACKING_INFO_TEMPLATE.format(tracking_number) if tracking_number else "No tracking number available"
     
-    return f"""
-    Order: {order['OrderNumber']}
-    Customer: {order['CustomerName']} ({order['Email']})
-    Status: {order['Status'].upper()}
-    Products Ordered: {products_ordered}
-    Tracking Info: {tracking_info}
-    """
+    return ORDER_INFO_TEMPLATE.format_map({
+        **order,
+        "status": order['Status'].upper(),
+        "products_ordered": products_ordered,
+        "tracking_info": tracking_info,
+    })
+
+# Readable descriptions of order statuses, keyed by lowercase status
+ORDER_STATUS_DESCRIPTIONS = {
+    "delivered": "The order has been delivered",
+    "in-transit": "The order is on its way",
+    "fulfilled": "The order has been processed and is ready for shipping",
+    "error": "There was an issue with the order"
+}
 
 def order_status_to_readable(status: str) -> str:
     """
     Convert order status to a readable format
     """
-    status_map = {
-        "delivered": "The order has been delivered",
-        "in-transit": "The order is on its way",
-        "fulfilled": "The order has been processed and is ready for shipping",
-        "error": "There was an issue with the order"
-    }
-    
-    return status_map.get(status.lower(), f"The order status is: {status}")
+    return ORDER_STATUS_DESCRIPTIONS.get(status.lower(), f"The order status is: {status}")
 
 def orders_to_context(orders: List[Dict[str, Any]]) -> str:
     """
@@ -82,11 +94,9 @@ async def track_order(tracking_number: str) -> Dict[str, Any]:
     """
     Track an order using its tracking number
     """
-    # Search all orders to find one with matching tracking number
-    orders = await search_orders()
-    matching_orders = [order for order in orders if order.get('TrackingNumber') == tracking_number]
-    
-    if not matching_orders:
+    # Let the API filter by tracking number instead of downloading every order
+    orders = await search_orders(tracking_number=tracking_number)
+    if not orders:
         raise ValueError(f"No order found with tracking number {tracking_number}")
     
-    return matching_orders[0]
+    return orders[0]
@@ -1,32 +1,90 @@
+import asyncio
 import json
 import os
+import time
 import httpx
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 
-# Local API base URL
-API_BASE = "http://localhost:8000"
+from agent.services.api_client import get_client, IN_PROCESS_API
+
+# The catalog changes on the order of hours, so recommendation turns share one fetch
+PRODUCTS_CACHE_TTL = float(os.getenv("PRODUCTS_CACHE_TTL", "300"))
+
+_catalog_cache: Optional[Tuple[float, List[Dict[str, Any]]]] = None
+_catalog_lock: Optional[asyncio.Lock] = None
+_catalog_lock_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def _get_catalog_lock() -> asyncio.Lock:
+    """
+    Get the lock that lets one caller refresh the catalog at a time, creating it on first use
+    """
+    global _catalog_lock, _catalog_lock_loop
+    loop = asyncio.get_running_loop()
+    # A lock is bound to the event loop it is first awaited on
+    if _catalog_lock is None or _catalog_lock_loop is not loop:
+        _catalog_lock = asyncio.Lock()
+        _catalog_lock_loop = loop
+    return _catalog_lock
+
+def _get_cached_products() -> Optional[List[Dict[str, Any]]]:
+    """
+    Return the cached catalog if it is still fresh
+    """
+    if _catalog_cache is None:
+        return None
+    fetched_at, products = _catalog_cache
+    if time.monotonic() - fetched_at >= PRODUCTS_CACHE_TTL:
+        return None
+    return products
 
 async def get_all_products() -> List[Dict[str, Any]]:
     """
-    Get all products from the product catalog without filtering
+    Get all products from the product catalog without filtering.
+    Results are cached for PRODUCTS_CACHE_TTL seconds.
     """
+    global _catalog_cache
+    products = _get_cached_products()
+    if products is not None:
+        return products
+
+    async with _get_catalog_lock():
+        # Another caller may have refreshed the catalog while we waited for the lock
+        products = _get_cached_products()
+        if products is not None:
+            return products
+
+        products = await _fetch_products()
+        # Failed fetches return [] and are not cached
+        if products:
+            _catalog_cache = (time.monotonic(), products)
+        return products
+
+async def _fetch_products() -> List[Dict[str, Any]]:
+    """
+    Fetch all products from the product catalog API
+    """
+    if IN_PROCESS_API:
+        # Imported here so the API server package only loads when it is used
+        from api.routes.products import find_products
+        return find_products()
+
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{API_BASE}/products/")
-            response.raise_for_status()
-            result = response.json()
+        client = get_client()
+        response = await client.get("/products/")
+        response.raise_for_status()
+        result = response.json()
+        
+        # Check for expected structure
+        if not isinstance(result, dict) or "products" not in result:
+            print(f"Unexpected API response format: {result}")
+            return []
             
-            # Check for expected structure
-            if not isinstance(result, dict) or "products" not in result:
-                print(f"Unexpected API response format: {result}")
-                return []
-                
-            products = result["products"]
-            if not isinstance(products, list):
-                print(f"API returned non-list products: {products}")
-                return []
-                
-            return products
+        products = result["products"]
+        if not isinstance(products, list):
+            print(f"API returned non-list products: {products}")
+            return []
+            
+        return products
     except httpx.HTTPError as e:
         print(f"HTTP error retrieving products: {e}")
         return []
@@ -6,3 +6,19 @@ class AgentState(Enum):
     INTENT_DETECTION = auto()  # Detecting user intent
     INFO_GATHERING = auto()  # Gathering info
     DATA_RETRIEVAL = auto()  # Retrieving data based on gathered info
+
+class Intent(Enum):
+    """Enum to represent the different intents a user might have."""
+    NONE = auto()  # No clear intent detected
+    ORDER_STATUS = auto()  # User wants to check order status + tracking link
+    PRODUCT_RECOMMENDATIONS = auto()  # User wants product recommendations
+    PROMOTIONS = auto()  # User wants to know about promotions
+    OTHER_DISCOUNTS = auto()  # User wants to know about other discounts/promotions
+
+# Intent classifier labels mapped to intents
+INTENT_BY_LABEL = {
+    "order_status": Intent.ORDER_STATUS,
+    "product_recommendations": Intent.PRODUCT_RECOMMENDATIONS,
+    "promotions": Intent.PROMOTIONS,
+    "other_discounts": Intent.OTHER_DISCOUNTS
+}
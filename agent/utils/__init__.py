@@ -1 +1 @@
-from . import agent_utils, product_utils, order_utils
\ No newline at end of file
+from . import openai_client, prompts, agent_utils, intent_cache, intent_batch, product_utils, order_utils
\ No newline at end of file
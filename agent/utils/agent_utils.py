@@ -1,15 +1,357 @@
-from agent.types import AgentState
-from openai import AsyncOpenAI
-from typing import List, Dict, Tuple
+from agent.types import AgentState, Intent
+from agent.utils.openai_client import openai, openai_slots
+from agent.utils.prompts import INTENT_INSTRUCTIONS_TEMPLATE, BATCH_INTENT_INSTRUCTIONS, SUMMARY_INSTRUCTIONS
+from agent.utils.intent_cache import SemanticIntentCache, PrototypeIntentClassifier, normalize
+from typing import List, Dict, Tuple, Any, Hashable, Literal, Optional
+from pydantic import BaseModel
+from collections import OrderedDict
+from itertools import islice
+import asyncio
+import hashlib
+import html
 import os
-import uuid
+import re
+import secrets
 import datetime
 import pytz 
 import dotenv
 
 dotenv.load_dotenv()
 
-openai = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+class LRUCache:
+    """Small in-process LRU cache backed by an OrderedDict."""
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key (marking it recently used), or None."""
+        try:
+            self._data.move_to_end(key)
+        except KeyError:
+            return None
+        return self._data[key]
+
+    def put(self, key: Hashable, value) -> None:
+        """Store value under key, evicting the least recently used entry when full."""
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+def conversation_cache_key(conversation: str) -> bytes:
+    """Compact cache key for a formatted conversation window."""
+    return hashlib.blake2b(conversation.encode("utf-8"), digest_size=16).digest()
+
+# Intent classifications keyed on the normalized recent user turns, so repeated
+# messages ("yes", "track my order", ...) skip the LLM round trip
+intent_cache = LRUCache(maxsize=int(os.getenv("INTENT_CACHE_SIZE", "256")))
+
+# Optional embedding-based fast path: a semantic cache of past classifications plus a
+# local prototype classifier. Off by default: a miss costs an embedding call on top
+# of the LLM classification.
+SEMANTIC_INTENT_CACHE = os.getenv("SEMANTIC_INTENT_CACHE", "false").lower() in ("1", "true", "yes")
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DIMENSIONS = 256
+
+# Intents that trigger customer-visible side effects need a closer match
+semantic_intent_cache = SemanticIntentCache(
+    maxsize=512,
+    threshold=0.93,
+    thresholds={"promotions": 0.97, "other_discounts": 0.95, "none": 0.9},
+)
+
+# Labelled example messages for the local prototype classifier, which answers
+# clear-cut requests from their embedding before falling back to the LLM
+INTENT_EXAMPLES = {
+    "order_status": [
+        "Where is my order?",
+        "What's the status of my order?",
+        "Has my package shipped yet?",
+        "Can you give me the tracking link for my order?",
+        "When will my delivery arrive?",
+    ],
+    "product_recommendations": [
+        "Can you recommend some hiking gear?",
+        "Do you sell waterproof jackets?",
+        "What backpacks do you have?",
+        "I need something warm for skiing",
+        "Which of your products are good for camping?",
+    ],
+    "promotions": [
+        "Tell me about the Early Risers promotion",
+        "Can I get the Early Risers discount?",
+        "Is the early riser promo still running?",
+    ],
+    "other_discounts": [
+        "Do you have any discount codes?",
+        "Can I get a coupon?",
+        "Are there any sales going on right now?",
+        "Can I have a discount for being a loyal customer?",
+    ],
+}
+
+intent_prototypes = PrototypeIntentClassifier(min_confidence=0.85)
+_intent_prototypes_task: Optional[asyncio.Task] = None
+
+async def _fit_intent_prototypes() -> None:
+    """Embed all intent examples in one request and fit the prototype classifier."""
+    texts, intents = [], []
+    for intent, examples in INTENT_EXAMPLES.items():
+        texts.extend(examples)
+        intents.extend([intent] * len(examples))
+
+    async with openai_slots():
+        response = await openai.embeddings.create(
+            model=EMBEDDING_MODEL,
+            input=texts,
+            dimensions=EMBEDDING_DIMENSIONS
+        )
+    vectors = [normalize(item.embedding) for item in sorted(response.data, key=lambda item: item.index)]
+    intent_prototypes.fit(vectors, intents)
+
+async def _ensure_intent_prototypes() -> None:
+    """Fit the prototype classifier once, sharing the work between concurrent callers."""
+    global _intent_prototypes_task
+    if intent_prototypes.is_fitted:
+        return
+    if _intent_prototypes_task is None or _intent_prototypes_task.done():
+        _intent_prototypes_task = asyncio.create_task(_fit_intent_prototypes())
+    await asyncio.shield(_intent_prototypes_task)
+
+async def _embed_text(text: str) -> List[float]:
+    """Embed text and normalize it for cosine similarity."""
+    async with openai_slots():
+        response = await openai.embeddings.create(
+            model=EMBEDDING_MODEL,
+            input=text,
+            dimensions=EMBEDDING_DIMENSIONS
+        )
+    return normalize(response.data[0].embedding)
+
+# Intent classification is a 5-way label choice, so a small model is plenty
+INTENT_MODEL = os.getenv("INTENT_MODEL", "gpt-4o-mini")
+
+# Longer user messages are truncated before classification
+INTENT_MESSAGE_MAX_CHARS = 500
+
+# Labels the intent classifier may return; structured outputs constrain the model to these
+IntentLabel = Literal["order_status", "product_recommendations", "promotions", "other_discounts", "none"]
+
+# Output budget for batched classification: JSON overhead plus a bounded, uniform
+# cost per entry, so batches have no long-running stragglers. An entry like
+# {"conversation":12,"intent":"product_recommendations"} is about 15 tokens.
+BATCH_BASE_OUTPUT_TOKENS = 16
+BATCH_OUTPUT_TOKENS_PER_INTENT = 20
+
+class IntentClassification(BaseModel):
+    intent: IntentLabel
+
+class IntentBatchItem(BaseModel):
+    conversation: int
+    intent: IntentLabel
+
+class IntentBatchClassification(BaseModel):
+    intents: List[IntentBatchItem]
+
+# Keyword patterns for the rule-based fast path, compiled once at import. Only specific
+# request words belong here; generic nouns ("product", "gear", "shipping") also show up in
+# returns, complaints, and product names, so those messages are left to the LLM.
+EARLY_RISERS_RX = re.compile(r"\bearly[\s-]?risers?\b", re.I)
+# "Early Risers" with a promotion word at most three words before or after it
+EARLY_RISERS_PROMO_RX = re.compile(
+    r"\bearly[\s-]?risers?(?:\W+\w+){0,3}?\W+(?:promos?|promotions?|discounts?|codes?)\b"
+    r"|\b(?:promos?|promotions?|discounts?|codes?)(?:\W+\w+){0,3}?\W+early[\s-]?risers?\b",
+    re.I,
+)
+DISCOUNT_RX = re.compile(r"\b(promos?|promotions?|promo codes?|discounts?|coupons?|vouchers?|sales?)\b", re.I)
+ORDER_RX = re.compile(r"\b(orders?|tracking|shipment|shipped|delivered)\b|\btrack (my|the|an?|our)\b|\bwhere(?:'s| is) my\b|#?\bW\d{3,}\b", re.I)
+# Product nouns ("my boots never arrived") also come up in order questions, so only
+# shopping requests count
+PRODUCT_RX = re.compile(r"\b(recommend\w*|suggest\w*)\b|\bdo you (sell|carry|stock)\b", re.I)
+
+# Order keywords ("order", "shipping", ...) also come up while shopping, so they only
+# decide the intent when the customer isn't already in another flow
+ORDER_RULE_INTENTS = frozenset({Intent.NONE, Intent.ORDER_STATUS})
+
+def _detect_intent_rules(text: str, current_intent: Intent = Intent.NONE) -> Optional[str]:
+    """
+    Classify a user message with keyword rules, without any network call.
+
+    Args:
+        text: The user message to classify
+        current_intent: The intent of the conversation so far
+
+    Returns:
+        The intent name when the rules are decisive, otherwise None
+    """
+    # Only the Early Risers Promotion counts as "promotions": asking for it by name is
+    # decisive, while any other mention of early risers is left to the LLM
+    if EARLY_RISERS_PROMO_RX.search(text):
+        return "promotions"
+    if EARLY_RISERS_RX.search(text):
+        return None
+
+    matches = set()
+    if DISCOUNT_RX.search(text):
+        matches.add("other_discounts")
+    if ORDER_RX.search(text) and current_intent in ORDER_RULE_INTENTS:
+        matches.add("order_status")
+    if PRODUCT_RX.search(text):
+        matches.add("product_recommendations")
+
+    return matches.pop() if len(matches) == 1 else None
+
+async def _classify_intent(conversation: str, current_intent) -> str:
+    """Classify a single conversation with one LLM call."""
+    async with openai_slots():
+        response = await openai.responses.parse(
+            model=INTENT_MODEL,
+            instructions=INTENT_INSTRUCTIONS_TEMPLATE.format(current_intent=current_intent),
+            input=conversation,
+            max_output_tokens=16,
+            temperature=0.25,
+            text_format=IntentClassification
+        )
+    # output_parsed is None only if the model refused to answer
+    parsed_response = response.output_parsed
+    return parsed_response.intent if parsed_response else "none"
+
+async def _classify_intent_batch(items: List[Tuple[str, Any]]) -> List[str]:
+    """
+    Classify several conversations with a single LLM call.
+
+    Args:
+        items: (conversation text, current intent) pairs
+
+    Returns:
+        One intent per item, in order. Items the model skipped, repeated, or numbered
+        wrongly (or all items, if the output was cut off) are re-classified one by one,
+        never guessed.
+    """
+    # Each conversation is customer-written text, so it is escaped inside its own tags
+    # and can't open, close, or forge another conversation's block
+    model_input = "\n\n".join(
+        f'<conversation id="{i}" current_intent="{current_intent}">\n{html.escape(conversation)}\n</conversation>'
+        for i, (conversation, current_intent) in enumerate(items, start=1)
+    )
+    try:
+        async with openai_slots():
+            response = await openai.responses.parse(
+                model=INTENT_MODEL,
+                instructions=BATCH_INTENT_INSTRUCTIONS,
+                input=model_input,
+                max_output_tokens=BATCH_BASE_OUTPUT_TOKENS + BATCH_OUTPUT_TOKENS_PER_INTENT * len(items),
+                temperature=0.25,
+                text_format=IntentBatchClassification
+            )
+        parsed_response = response.output_parsed if response.status == "completed" else None
+    except ValueError as e:
+        # Truncated or malformed JSON fails validation
+        print(f"Error parsing intent batch: {e}")
+        parsed_response = None
+
+    labels: Dict[int, List[str]] = {}
+    for item in (parsed_response.intents if parsed_response else []):
+        labels.setdefault(item.conversation, []).append(item.intent)
+
+    intents = [labels[i][0] if len(labels.get(i, ())) == 1 else None for i in range(1, len(items) + 1)]
+    missing = [i for i, intent in enumerate(intents) if intent is None]
+    if missing:
+        retried = await asyncio.gather(*(_classify_intent(*items[i]) for i in missing))
+        for i, intent in zip(missing, retried):
+            intents[i] = intent
+    return intents
+
+class IntentBatcher:
+    """
+    Coalesces intent classification requests from concurrent sessions that arrive
+    within a short window into a single LLM call, then fans the labels back out.
+    With max_batch=1 every request is classified on its own, with no waiting.
+    """
+
+    def __init__(self, max_batch: int = 1, max_wait_ms: int = 20):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._loop = None
+        self._queue = None
+        self._worker = None
+        self._dispatches = set()
+
+    async def submit(self, conversation: str, current_intent) -> Tuple[str, bool]:
+        """
+        Queue a conversation for classification and wait for its intent.
+
+        Returns:
+            The intent, and whether it came from a call shared with other conversations
+        """
+        if self.max_batch <= 1:
+            return await _classify_intent(conversation, current_intent), False
+
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            # (Re)start the worker on the running loop, e.g. after a new asyncio.run()
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+        future = loop.create_future()
+        self._queue.put_nowait((conversation, current_intent, future))
+        return await future
+
+    async def _run(self) -> None:
+        """Collect requests for up to max_wait (or max_batch items) and dispatch them together."""
+        while True:
+            batch = [await self._queue.get()]
+            await asyncio.sleep(self.max_wait)
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            # Dispatch in the background so the next window can start collecting
+            task = asyncio.create_task(self._dispatch(batch))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self, batch: List[Tuple[str, Any, asyncio.Future]]) -> None:
+        """Run one classification call for the batch and resolve each caller's future."""
+        # Skip callers that were cancelled while waiting
+        batch = [item for item in batch if not item[2].done()]
+        if not batch:
+            return
+
+        shared = len(batch) > 1
+        try:
+            if not shared:
+                conversation, current_intent, _ = batch[0]
+                intents = [await _classify_intent(conversation, current_intent)]
+            else:
+                intents = await _classify_intent_batch([(conversation, current_intent) for conversation, current_intent, _ in batch])
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, _, future), intent in zip(batch, intents):
+            if not future.done():
+                future.set_result((intent, shared))
+
+# Classification requests arriving within INTENT_BATCH_WAIT_MS of each other share one LLM call.
+# Off by default: a shared call puts different customers' messages in one prompt.
+intent_batcher = IntentBatcher(
+    max_batch=int(os.getenv("INTENT_BATCH_SIZE", "1")),
+    max_wait_ms=int(os.getenv("INTENT_BATCH_WAIT_MS", "20")),
+)
+
+# Early Risers Promotion runs 8-10 AM Pacific Time
+PACIFIC_TZ = pytz.timezone('America/Los_Angeles')
+EARLY_RISERS_CODE_MESSAGE = "Great news! You qualify for our Early Risers Promotion ☀️. Here's your unique 10% discount code: {code}\n\nThis code is valid for your next purchase. Can I help you with anything else?"
+EARLY_RISERS_CLOSED_MESSAGE = "The Early Risers Promotion is only available between 8:00 AM and 10:00 AM Pacific Time ☀️. Current time is {time_str}. Please check back during promotion hours. Can I help you with anything else?"
 
 def handle_early_risers_promotion() -> str:
     """
@@ -21,18 +363,17 @@ def handle_early_risers_promotion() -> str:
         A formatted response message
     """
     # Get current time in Pacific timezone
-    pacific_tz = pytz.timezone('America/Los_Angeles')
-    current_time = datetime.datetime.now(pacific_tz)
+    current_time = datetime.datetime.now(PACIFIC_TZ)
     
     # Check if time is between 8-10 AM
     if 8 <= current_time.hour < 10:
         # Generate unique discount code
-        discount_code = f"EARLY-{uuid.uuid4().hex[:8].upper()}"
-        return f"Great news! You qualify for our Early Risers Promotion ☀️. Here's your unique 10% discount code: {discount_code}\n\nThis code is valid for your next purchase. Can I help you with anything else?"
+        discount_code = f"EARLY-{secrets.token_hex(4).upper()}"
+        return EARLY_RISERS_CODE_MESSAGE.format(code=discount_code)
     else:
         # Not eligible for promotion
         time_str = current_time.strftime('%I:%M %p')
-        return f"The Early Risers Promotion is only available between 8:00 AM and 10:00 AM Pacific Time ☀️. Current time is {time_str}. Please check back during promotion hours. Can I help you with anything else?"
+        return EARLY_RISERS_CLOSED_MESSAGE.format(time_str=time_str)
 
 def handle_other_promotion_requests() -> str:
     """
@@ -44,95 +385,171 @@ def handle_other_promotion_requests() -> str:
     """
     return "I'm sorry, but the promotion or discount you're asking about isn't currently available. Is there something else I can help you with?"
 
+# Maximum number of messages kept in a conversation's history
+CONVERSATION_HISTORY_MAXLEN = 200
+
+# Token budget for the verbatim recent conversation sent to the LLM, estimated from
+# characters (about 4 per token for English text) so no tokenizer is needed
+CONVERSATION_MAX_TOKENS = 1500
+CHARS_PER_TOKEN = 4
+
+# Rolling summary of older history: once more than SUMMARY_TRIGGER_MESSAGES messages are
+# unsummarized, everything but the last SUMMARY_KEEP_MESSAGES is folded into the summary
+# in the background, so prompts carry a short summary plus a bounded verbatim window
+SUMMARY_MODEL = "gpt-4o-mini"
+SUMMARY_TRIGGER_MESSAGES = 20
+SUMMARY_KEEP_MESSAGES = 10
+SUMMARY_MAX_OUTPUT_TOKENS = 150
+
 class AgentUtilsMixin:
+    def _add_message(self, role: str, content: str) -> None:
+        """Append a message to the conversation history."""
+        self.conversation_history.append({"role": role, "content": content})
+        self._formatted_lines.append(self._format_message(role, content))
+        self._message_count += 1
+        if role == "user":
+            self._last_user_message = content
+
     def _get_last_user_message(self) -> str:
         """Get the last user message from conversation history."""
-        for message in reversed(self.conversation_history):
-            if message["role"] == "user":
-                return message["content"]
-        return ""
+        return self._last_user_message
+
+    def _get_recent_messages(self, num_messages: int) -> List[Dict[str, str]]:
+        """Get up to the specified number of most recent messages, oldest first."""
+        start = max(0, len(self.conversation_history) - num_messages)
+        return list(islice(self.conversation_history, start, None))
+
+    def _get_intent_messages(self) -> List[Dict[str, str]]:
+        """
+        Get the messages that matter for intent classification: the last two user
+        messages among the recent turns, each truncated to INTENT_MESSAGE_MAX_CHARS.
+        Assistant replies are long canned templates that only add input tokens.
+        """
+        user_messages = [m for m in self._get_recent_messages(6) if m["role"] == "user"][-2:]
+        return [{"role": "user", "content": m["content"][:INTENT_MESSAGE_MAX_CHARS]} for m in user_messages]
+
+    def _intent_cache_key(self, messages: List[Dict[str, str]]) -> Tuple:
+        """
+        Build the intent cache key from the classifier's user messages (lowercased,
+        whitespace-collapsed) and the current intent.
+        """
+        normalized = tuple(" ".join(m["content"].lower().split()) for m in messages)
+        return (self.current_intent, normalized)
 
     async def _detect_intent_llm(self) -> str:
         """Detect the intent of the user message using LLM"""
+        # Unambiguous keyword matches don't need the LLM at all
+        rule_intent = _detect_intent_rules(self._get_last_user_message(), self.current_intent)
+        if rule_intent is not None:
+            return rule_intent
 
-        system_message = f"""
-        You are the CORE INTENT CLASSIFIER within Sierra Outfitters' customer service AI orchestration system.
-        
-        YOUR ROLE: Accurately determine the customer's current intent to route the conversation to the appropriate specialized handling module.
-        
-        IMPORTANT CONTEXT:
-        - You are the primary orchestrator for conversation flow decisions
-        - Your classification directly determines which specialized AI component handles the customer's request
-        - The entire customer experience depends on consistent and accurate intent classification
-        - This is an ongoing conversation with context and history, not isolated messages
-        
-        CLASSIFICATION TASK:
-        Classify the user's intent into ONE of the following categories:
-        - order_status: Questions or discussions about a customer's order status or delivery
-        - product_recommendations: Requests or discussions about product suggestions or information
-        - promotions: ONLY for explicit requests about the "Early Risers Promotion"
-        - other_discounts: Requests for ANY other mention of discount, coupon, sale, or promotion EXCEPT Early Risers. 
-        - none: Only if the query doesn't fit any above categories
-        
-        CONVERSATION CONTEXT AWARENESS:
-        - The current conversation intent is: {self.current_intent}
-        - Maintain conversational coherence by preserving this intent unless there's a clear change
-        - User messages are part of a continuous dialogue, not isolated requests
-        - Follow-up questions, clarifications, or additional details about the same topic should maintain the current intent
-        - Only change the intent when the customer explicitly shifts to a new topic
-        
-        SPECIFIC CLASSIFICATION GUIDELINES:
-        - For "order_status": Include any questions about orders, shipping, tracking, or delivery status
-        - For "product_recommendations": Include product searches, inquiries about features, availability, or comparisons
-        - For "promotions": ONLY use when customer explicitly mentions "Early Risers" or "Early Riser" promotion
-        - For "other_discounts": Use for ANY request about discounts, coupons, sales, or promotions EXCEPT Early Risers
-        - For "none": Use only when the customer's intent truly doesn't match any of the defined categories
-        
-        CRITICAL REMINDER:
-        - "promotions" is ONLY for the specific "Early Risers Promotion", nothing else
-        - "other_discounts" covers all other discount/promotion requests
-        - Your classification determines the entire conversation path, so be precise and consistent
-        - When in doubt about a new topic, consider whether it relates to the current intent
-        
-        Return ONLY the intent name without explanations or additional text.
-        """
-        
-        recent_conversation = self._get_recent_conversation()
+        intent_messages = self._get_intent_messages()
+        cache_key = self._intent_cache_key(intent_messages)
+        cached_intent = intent_cache.get(cache_key)
+        if cached_intent is not None:
+            return cached_intent
+
+        embedding = None
+        if SEMANTIC_INTENT_CACHE:
+            try:
+                embedding = await _embed_text(self._get_last_user_message())
+                similar_intent = semantic_intent_cache.lookup(embedding, self.current_intent)
+                if similar_intent is None:
+                    await _ensure_intent_prototypes()
+                    similar_intent = intent_prototypes.predict(embedding)
+                # Approximate matches are not written to the exact-key intent cache
+                if similar_intent is not None:
+                    return similar_intent
+            except Exception as e:
+                print(f"Error checking semantic intent cache: {e}")
+
+        intent_conversation = self._format_conversation_text(intent_messages)
         
         try:
-            response = await openai.responses.create(
-                model="gpt-4o",
-                instructions=system_message,
-                input=recent_conversation,
-                max_output_tokens=16,
-                temperature=0.25
-            )
-            intent = response.output_text.strip().lower()
-            
-            # Validate that the intent is one of our expected values
-            valid_intents = ["order_status", "product_recommendations", 
-                             "promotions", "other_discounts", "none"]
-            
-            if intent not in valid_intents:
-                intent = "none"
-                
+            intent, shared = await intent_batcher.submit(intent_conversation, self.current_intent)
+
+            # Negative ("none") results are cached too; failed calls below are not. Labels
+            # from a call shared with other sessions are used once but never cached.
+            if not shared:
+                intent_cache.put(cache_key, intent)
+                if embedding is not None:
+                    semantic_intent_cache.add(embedding, self.current_intent, intent)
             return intent
         except Exception as e:
             print(f"Error detecting intent: {e}")
             return "none"
 
-    def _get_recent_conversation(self, num_messages: int = 25) -> str:
+    def _get_recent_conversation(self, num_messages: int = 25, max_tokens: int = CONVERSATION_MAX_TOKENS) -> str:
         """
-        Get recent conversation history as formatted text, limited to the specified number of messages.
+        Get recent conversation history as formatted text, limited to the specified number of
+        messages and (approximately) tokens. The latest message is always included.
         
         Args:
             num_messages: Maximum number of recent messages to return
+            max_tokens: Approximate token budget for the returned messages
             
         Returns:
             Formatted conversation text as a string
         """
-        recent_messages = self.conversation_history[-num_messages:] if len(self.conversation_history) >= num_messages else self.conversation_history
-        return self._format_conversation_text(recent_messages)
+        # Messages already folded into the summary are replaced by it
+        start = max(self._summarized_upto, self._message_count - num_messages)
+        lines = self._get_formatted_lines(start, self._message_count)
+        
+        # Keep the newest messages that fit in the token budget
+        budget = max_tokens * CHARS_PER_TOKEN
+        kept = 0
+        for line in reversed(lines):
+            budget -= len(line)
+            if budget < 0 and kept:
+                break
+            kept += 1
+        recent_text = "".join(lines[len(lines) - kept:])
+        if not self._summary:
+            return recent_text
+        return f"Summary of earlier conversation: {self._summary}\n{recent_text}"
+
+    def _get_formatted_lines(self, start: int, end: int) -> List[str]:
+        """
+        Get the formatted lines for messages start to end (exclusive), counted from the
+        beginning of the conversation. Messages already dropped from history are skipped.
+        """
+        offset = self._message_count - len(self._formatted_lines)
+        return list(islice(self._formatted_lines, max(0, start - offset), max(0, end - offset)))
+
+    def _maybe_start_summary(self) -> None:
+        """Fold older messages into the rolling summary in the background once enough have accumulated."""
+        if self._summary_task is not None and not self._summary_task.done():
+            return
+        if self._message_count - self._summarized_upto <= SUMMARY_TRIGGER_MESSAGES:
+            return
+        self._summary_task = asyncio.create_task(self._update_summary(self._message_count - SUMMARY_KEEP_MESSAGES))
+
+    async def _update_summary(self, end: int) -> None:
+        """
+        Summarize messages up to end (exclusive) into the rolling summary.
+        The summary is only replaced once the new one is complete.
+        """
+        new_text = "".join(self._get_formatted_lines(self._summarized_upto, end))
+        try:
+            async with openai_slots():
+                response = await openai.responses.create(
+                    model=SUMMARY_MODEL,
+                    instructions=SUMMARY_INSTRUCTIONS,
+                    input=f"Summary so far:\n{self._summary}\n\nNew messages:\n{new_text}",
+                    max_output_tokens=SUMMARY_MAX_OUTPUT_TOKENS,
+                    temperature=0
+                )
+            summary = response.output_text.strip()
+        except Exception as e:
+            print(f"Error summarizing conversation: {e}")
+            return
+        if summary:
+            self._summary = summary
+            self._summarized_upto = end
+
+    def _format_message(self, role: str, content: str) -> str:
+        """Format a single conversation message as a line of text."""
+        return f"{'User' if role == 'user' else 'Assistant'}: {content}\n"
     
     def _format_conversation_text(self, messages: List[Dict[str, str]]) -> str:
         """
@@ -144,23 +561,28 @@ class AgentUtilsMixin:
         Returns:
             Formatted conversation text
         """
-        conversation_text = ""
-        for msg in messages:
-            role = "User" if msg["role"] == "user" else "Assistant"
-            conversation_text += f"{role}: {msg['content']}\n"
-        return conversation_text
+        return "".join(self._format_message(msg["role"], msg["content"]) for msg in messages)
     
-    async def _send_response(self, response: str, next_state: AgentState = AgentState.INTENT_DETECTION) -> str:
+    def _emit(self, chunk: str) -> None:
+        """Push a chunk of the current response to the active stream, if any."""
+        if self._stream_queue is not None and chunk:
+            self._stream_queue.put_nowait(chunk)
+
+    async def _send_response(self, response: str, next_state: AgentState = AgentState.INTENT_DETECTION, streamed: bool = False) -> str:
         """
         Send a response to the user and update state.
         
         Args:
             response: Message to send to the user
             next_state: The state to transition to after sending the response
+            streamed: Whether the response was already emitted to the stream chunk by chunk
             
         Returns:
             The response message
         """
-        self.conversation_history.append({"role": "assistant", "content": response})
+        if not streamed:
+            self._emit(response)
+        self._add_message("assistant", response)
+        self._maybe_start_summary()
         self.state = next_state
-        return response
\ No newline at end of file
+        return response
@@ -0,0 +1,119 @@
+from agent.utils.openai_client import openai
+from agent.utils.agent_utils import INTENT_MODEL, IntentLabel
+from agent.utils.prompts import INTENT_INSTRUCTIONS_TEMPLATE
+from openai.types.responses import Response
+from typing import List, Tuple, Any, get_args
+import asyncio
+import json
+
+# Offline intent classification through the OpenAI Batch API: half the price of live
+# calls and separate rate limits, but results can take up to 24 hours. Meant for
+# evaluation and replay runs over recorded conversations, never for live traffic.
+
+BATCH_POLL_INTERVAL = 30.0
+BATCH_TERMINAL_STATUSES = frozenset({"completed", "failed", "expired", "cancelled"})
+
+# Same constraint as the live classifier's IntentClassification model, written out as a
+# strict JSON schema since batch request bodies are plain JSON
+INTENT_TEXT_FORMAT = {
+    "type": "json_schema",
+    "name": "IntentClassification",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {"intent": {"type": "string", "enum": list(get_args(IntentLabel))}},
+        "required": ["intent"],
+        "additionalProperties": False,
+    },
+}
+
+def build_batch_requests(conversations: List[Tuple[str, Any]]) -> bytes:
+    """
+    Build the JSONL batch input, one /v1/responses request per conversation.
+
+    Args:
+        conversations: (conversation text, current intent) pairs
+
+    Returns:
+        The JSONL file contents, with each request's custom_id set to its index
+    """
+    lines = []
+    for i, (conversation, current_intent) in enumerate(conversations):
+        lines.append(json.dumps({
+            "custom_id": str(i),
+            "method": "POST",
+            "url": "/v1/responses",
+            "body": {
+                "model": INTENT_MODEL,
+                "instructions": INTENT_INSTRUCTIONS_TEMPLATE.format(current_intent=current_intent),
+                "input": conversation,
+                "max_output_tokens": 16,
+                "temperature": 0.25,
+                "text": {"format": INTENT_TEXT_FORMAT},
+            },
+        }))
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+def parse_batch_output(output: str, count: int) -> List[str]:
+    """
+    Parse the batch output file into intents.
+
+    Args:
+        output: The JSONL output file contents
+        count: Number of conversations submitted
+
+    Returns:
+        One intent per conversation, in submission order ("none" where a request failed)
+    """
+    intents = ["none"] * count
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+        result = json.loads(line)
+        response = result.get("response")
+        if not response or response.get("status_code") != 200:
+            continue
+        try:
+            text = Response.model_validate(response["body"]).output_text
+            intents[int(result["custom_id"])] = json.loads(text)["intent"]
+        except (ValueError, KeyError, IndexError) as e:
+            print(f"Error parsing batch result {result.get('custom_id')}: {e}")
+    return intents
+
+async def classify_batch(conversations: List[Tuple[str, Any]], poll_interval: float = BATCH_POLL_INTERVAL) -> List[str]:
+    """
+    Classify conversations through the Batch API and wait for the results.
+
+    Args:
+        conversations: (conversation text, current intent) pairs, formatted like the
+            live classifier's input
+        poll_interval: Seconds between batch status checks
+
+    Returns:
+        One intent per conversation, in order
+
+    Raises:
+        RuntimeError: If the batch fails, expires, or is cancelled
+    """
+    if not conversations:
+        return []
+
+    batch_file = await openai.files.create(
+        file=("intent_batch.jsonl", build_batch_requests(conversations)),
+        purpose="batch"
+    )
+    batch = await openai.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/responses",
+        completion_window="24h"
+    )
+
+    while batch.status not in BATCH_TERMINAL_STATUSES:
+        await asyncio.sleep(poll_interval)
+        batch = await openai.batches.retrieve(batch.id)
+
+    if batch.status != "completed" or not batch.output_file_id:
+        raise RuntimeError(f"Intent batch {batch.id} ended with status {batch.status}")
+
+    output = await openai.files.content(batch.output_file_id)
+    return parse_batch_output(output.text, len(conversations))
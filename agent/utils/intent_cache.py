@@ -0,0 +1,114 @@
+import math
+import operator
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence
+
+def normalize(vector: Sequence[float]) -> List[float]:
+    """
+    Scale a vector to unit length so dot products are cosine similarities.
+    """
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+class SemanticIntentCache:
+    """
+    Nearest-neighbour cache of intent classifications over normalized message embeddings.
+    Entries only match lookups made under the same current intent, since the classifier
+    answer for a follow-up like "yes" depends on the conversation so far.
+    """
+
+    def __init__(self, maxsize: int = 512, threshold: float = 0.93, thresholds: Optional[Dict[str, float]] = None):
+        """
+        Args:
+            maxsize: Maximum number of cached embeddings; the oldest are evicted first
+            threshold: Minimum cosine similarity for a hit
+            thresholds: Per-intent overrides of the similarity threshold
+        """
+        self.threshold = threshold
+        self.thresholds = thresholds or {}
+        self._entries = deque(maxlen=maxsize)
+
+    def lookup(self, vector: List[float], current_intent: Any) -> Optional[str]:
+        """
+        Find the intent of the most similar cached message.
+
+        Args:
+            vector: Normalized embedding of the user message
+            current_intent: The conversation's current intent
+
+        Returns:
+            The cached intent if the best match clears its threshold, otherwise None
+        """
+        best_intent, best_score = None, -1.0
+        for entry_vector, entry_context, intent in self._entries:
+            if entry_context != current_intent:
+                continue
+            score = sum(map(operator.mul, vector, entry_vector))
+            if score > best_score:
+                best_intent, best_score = intent, score
+
+        if best_intent is not None and best_score >= self.thresholds.get(best_intent, self.threshold):
+            return best_intent
+        return None
+
+    def add(self, vector: List[float], current_intent: Any, intent: str) -> None:
+        """
+        Cache the intent classified for a message embedding.
+        """
+        self._entries.append((vector, current_intent, intent))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class PrototypeIntentClassifier:
+    """
+    Local nearest-prototype intent classifier over embeddings of labelled example
+    messages. Per-intent best similarities are turned into a softmax distribution so
+    callers can fall back to the LLM when the prediction isn't confident.
+    """
+
+    def __init__(self, temperature: float = 0.05, min_confidence: float = 0.85, min_similarity: float = 0.6):
+        """
+        Args:
+            temperature: Softmax temperature applied to cosine similarities
+            min_confidence: Minimum softmax probability of the predicted intent
+            min_similarity: Minimum cosine similarity to the closest example
+        """
+        self.temperature = temperature
+        self.min_confidence = min_confidence
+        self.min_similarity = min_similarity
+        self._prototypes: List[tuple] = []
+
+    @property
+    def is_fitted(self) -> bool:
+        return bool(self._prototypes)
+
+    def fit(self, vectors: List[List[float]], intents: List[str]) -> None:
+        """
+        Replace the prototypes with normalized example embeddings and their intents.
+        """
+        self._prototypes = list(zip(vectors, intents))
+
+    def predict(self, vector: List[float]) -> Optional[str]:
+        """
+        Predict the intent of a normalized message embedding.
+
+        Returns:
+            The predicted intent if it clears both confidence thresholds, otherwise None
+        """
+        best_scores: Dict[str, float] = {}
+        for prototype, intent in self._prototypes:
+            score = sum(map(operator.mul, vector, prototype))
+            if score > best_scores.get(intent, -1.0):
+                best_scores[intent] = score
+        if not best_scores:
+            return None
+
+        best_intent = max(best_scores, key=best_scores.get)
+        best_score = best_scores[best_intent]
+        weights = {intent: math.exp((score - best_score) / self.temperature) for intent, score in best_scores.items()}
+        confidence = weights[best_intent] / sum(weights.values())
+
+        if best_score >= self.min_similarity and confidence >= self.min_confidence:
+            return best_intent
+        return None
@@ -0,0 +1,42 @@
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+import asyncio
+import httpx
+import os
+from typing import Optional
+import dotenv
+
+dotenv.load_dotenv()
+
+# Single OpenAI client shared by all agents and mixins, so every session reuses one
+# pre-sized connection pool instead of opening new connections per call
+openai = AsyncOpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    timeout=float(os.getenv("OPENAI_TIMEOUT", "30")),
+    max_retries=2,
+    http_client=DefaultAsyncHttpxClient(
+        limits=httpx.Limits(
+            max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", "200")),
+            max_keepalive_connections=int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "100")),
+        )
+    ),
+)
+
+# Bounds the OpenAI requests in flight across all sessions, so bursts queue locally
+# instead of tripping rate limits; size it to the account's limits
+OPENAI_CONCURRENCY = int(os.getenv("OPENAI_CONCURRENCY", "50"))
+
+_slots: Optional[asyncio.Semaphore] = None
+_slots_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def openai_slots() -> asyncio.Semaphore:
+    """
+    Get the semaphore bounding in-flight OpenAI requests, creating it on first use.
+    Use as `async with openai_slots():` around each OpenAI call.
+    """
+    global _slots, _slots_loop
+    loop = asyncio.get_running_loop()
+    # A semaphore is bound to the event loop it is first awaited on
+    if _slots is None or _slots_loop is not loop:
+        _slots = asyncio.Semaphore(OPENAI_CONCURRENCY)
+        _slots_loop = loop
+    return _slots
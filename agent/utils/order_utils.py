@@ -1,20 +1,38 @@
 from agent.services.orders import search_orders, get_order_details, track_order, format_order_info, order_status_to_readable, orders_to_context
 from agent.types import AgentState
+from agent.utils.openai_client import openai, openai_slots
+from agent.utils.agent_utils import LRUCache, conversation_cache_key
+from agent.utils.prompts import ORDER_EXTRACTION_INSTRUCTIONS
+import asyncio
+import httpx
 import json
-from openai import AsyncOpenAI
-import os
+import re
 from typing import List, Dict, Any, Optional
-import dotenv
 from pydantic import BaseModel
 
-dotenv.load_dotenv()
-
-openai = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
 class OrderDetails(BaseModel):
     order_number: Optional[str] = None
     email: Optional[str] = None
 
+# Order numbers (with or without the "#") and emails typed verbatim can be picked out
+# without an LLM call
+ORDER_NUMBER_RX = re.compile(r"#?\bW\d+\b", re.IGNORECASE)
+EMAIL_RX = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]*\w")
+
+# Requests for missing order details, keyed on (has order number, has email)
+MISSING_ORDER_INFO_MESSAGES = {
+    (False, False): "To check your order status, I'll need your order number and email address. Can you please provide this information?",
+    (False, True): "I have your email address ({email}), but I still need your order number (starts with #W). Could you please provide it?",
+    (True, False): "I have your order number ({order_number}), but I still need the email address associated with this order. Could you please provide it?",
+}
+
+# LLM-extracted order details keyed on a hash of the conversation window they came from
+order_details_cache = LRUCache(maxsize=512)
+
+def _prefer_newest(newest: Dict[str, Optional[str]], extracted: Dict[str, Optional[str]]) -> Dict[str, Optional[str]]:
+    """Merge LLM-extracted details with those read from the newest message, which win."""
+    return {key: newest[key] or extracted[key] for key in ("order_number", "email")}
+
 class OrderUtilsMixin:
     async def _extract_order_details_with_llm(self) -> Dict[str, Optional[str]]:
         """
@@ -24,69 +42,132 @@ class OrderUtilsMixin:
         Returns:
             Dict with keys 'order_number' and 'email', values can be None if not found
         """
+        # Fast path: the newest message supplied details in a recognizable form and,
+        # together with the details already collected, nothing is missing. Anything else
+        # (e.g. a correction the regexes can't read) goes to the LLM.
+        order_details = self._extract_order_details_with_regex()
+
+        # Start looking up the most likely order now, so the API round trip overlaps
+        # the extraction (and any concurrent intent check); it is discarded if the
+        # extracted order number turns out different
+        order_number_guess = order_details["order_number"] or self.collected_info.get("order_number")
+        if order_number_guess:
+            self._start_order_prefetch(order_number_guess)
+
+        if (
+            (order_details["order_number"] or order_details["email"])
+            and order_number_guess
+            and (order_details["email"] or self.collected_info.get("email"))
+        ):
+            return order_details
+        regex_details = order_details
+
         # Get recent conversation
         recent_conversation = self._get_recent_conversation()
-        
-        system_message = """
-        You are a specialized information extraction component within a larger customer service AI orchestration system for Sierra Outfitters.
-    
-        YOUR ROLE: Extract key order identification details from an ongoing customer service conversation to facilitate order lookups.
-        
-        IMPORTANT CONTEXT:
-        - You are analyzing a real conversation between a customer and our service agent
-        - The conversation is ongoing and may contain corrections, changes, or updates to previously provided information
-        - Customers may provide partial information, correct previous information, or refer to information from earlier in the conversation
-        - Always prioritize the most recently provided information when there are contradictions
-        
-        EXTRACTION TASK:
-        Look for the following specific details:
-        1. Order number (format: #W followed by digits, e.g., #W001, #W123)
-        2. Customer email address
-        
-        EXTRACTION GUIDELINES:
-        - If multiple order numbers are mentioned, use the most recently mentioned one
-        - If multiple email addresses are mentioned, use the most recently mentioned one
-        - The customer may have corrected a typo or provided updated information - always use their most recent statement
-        - If the information is not present in the conversation, return null
-        
-        Return your findings in this JSON format:
-        {
-            "order_number": "the order number or null if not found",
-            "email": "the email address or null if not found"
-        }
-        
-        Only return the JSON object, nothing else.
-        """
+        cache_key = conversation_cache_key(recent_conversation)
+        cached_details = order_details_cache.get(cache_key)
+        if cached_details is not None:
+            return _prefer_newest(regex_details, cached_details)
         
         try:
-            response = await openai.responses.parse(
-                model="gpt-4o",
-                instructions=system_message,
-                input=recent_conversation,
-                max_output_tokens=256,
-                temperature=0.3,
-                text_format=OrderDetails
-            )
+            async with openai_slots():
+                response = await openai.responses.parse(
+                    model="gpt-4o",
+                    instructions=ORDER_EXTRACTION_INSTRUCTIONS,
+                    input=recent_conversation,
+                    max_output_tokens=256,
+                    temperature=0,
+                    text_format=OrderDetails
+                )
             
             # Access the parsed Pydantic model directly
             parsed_response = response.output_parsed
             
-            # Create the order details dictionary from the Pydantic model
+            # Create the order details dictionary from the Pydantic model,
+            # treating empty or "null" strings as missing
+            order_number = parsed_response.order_number or None
+            if order_number == "null":
+                order_number = None
+            email = parsed_response.email or None
+            if email == "null":
+                email = None
             order_details = {
-                "order_number": parsed_response.order_number,
-                "email": parsed_response.email
+                "order_number": order_number,
+                "email": email
             }
             
-            return order_details
+            order_details_cache.put(cache_key, order_details)
+            return _prefer_newest(regex_details, order_details)
             
         except Exception as e:
             print(f"Error extracting order details: {e}")
-            return {
-                "order_number": None,
-                "email": None
-            }
+            return dict(regex_details)
+
+    def _extract_order_details_with_regex(self) -> Dict[str, Optional[str]]:
+        """
+        Extract order number and email from the newest user message with regular expressions.
+        Order numbers are normalized to the "#W..." form.
+
+        Returns:
+            Dict with keys 'order_number' and 'email', values can be None if not found
+        """
+        message = self._get_last_user_message()
+        order_numbers = ORDER_NUMBER_RX.findall(message)
+        emails = EMAIL_RX.findall(message)
+        return {
+            "order_number": "#" + order_numbers[-1].lstrip("#").upper() if order_numbers else None,
+            "email": emails[-1] if emails else None,
+        }
 
-    async def _handle_order_info_gathering(self) -> str:
+    def _start_order_prefetch(self, order_number: str) -> None:
+        """
+        Speculatively start looking up an order while the customer is still providing
+        their email, so the API round trip overlaps with their reply.
+        """
+        if self._pending_order_task is not None and self._pending_order_number == order_number:
+            return
+        self._cancel_order_prefetch()
+        self._pending_order_number = order_number
+        self._pending_order_task = asyncio.create_task(search_orders(order_number=order_number))
+
+    def _cancel_order_prefetch(self) -> None:
+        """Cancel any speculative order lookup, e.g. when the customer abandons the order flow."""
+        if self._pending_order_task is not None:
+            self._pending_order_task.cancel()
+        self._pending_order_task = None
+        self._pending_order_number = None
+
+    async def _lookup_order(self, order_number: str, email: str) -> Dict[str, Any]:
+        """
+        Get the order matching the order number and email, reusing a speculative
+        lookup for the same order number when one is in flight.
+
+        Returns:
+            The matching order
+
+        Raises:
+            ValueError: If no order matches
+        """
+        if self._pending_order_task is None or self._pending_order_number != order_number:
+            self._cancel_order_prefetch()
+            return await get_order_details(order_number=order_number, customer_email=email)
+
+        task = self._pending_order_task
+        self._pending_order_task = None
+        self._pending_order_number = None
+        try:
+            orders = await task
+        except httpx.HTTPError:
+            # The speculative request failed; retry with a regular lookup
+            return await get_order_details(order_number=order_number, customer_email=email)
+
+        # The prefetch only filtered by order number, so check the email locally
+        orders = [order for order in orders if order["Email"].lower() == email.lower()]
+        if not orders:
+            raise ValueError(f"No order found with number {order_number}")
+        return orders[0]
+
+    async def _handle_order_info_gathering(self, order_details: Optional[Dict[str, Optional[str]]] = None) -> str:
         """
         Handle order information gathering process.
         This function:
@@ -95,11 +176,15 @@ class OrderUtilsMixin:
         3. Manages state transitions
         4. Returns appropriate response messages
         
+        Args:
+            order_details: Order details already extracted by the caller, if any
+            
         Returns:
             Response message to user
         """
         # Extract order details from conversation history
-        order_details = await self._extract_order_details_with_llm()
+        if order_details is None:
+            order_details = await self._extract_order_details_with_llm()
         
         # Update collected info with any new information found
         if order_details["order_number"]:
@@ -116,16 +201,9 @@ class OrderUtilsMixin:
             self.state = AgentState.DATA_RETRIEVAL
             return await self._handle_data_retrieval()
         
-        # Otherwise, ask for the missing info
-        if not order_number and not email:
-            info_request_msg = "To check your order status, I'll need your order number and email address. Can you please provide this information?"
-            return await self._send_response(info_request_msg, AgentState.INFO_GATHERING)
-        elif not order_number:
-            info_request_msg = f"I have your email address ({email}), but I still need your order number (starts with #W). Could you please provide it?"
-            return await self._send_response(info_request_msg, AgentState.INFO_GATHERING)
-        elif not email:
-            info_request_msg = f"I have your order number ({order_number}), but I still need the email address associated with this order. Could you please provide it?"
-            return await self._send_response(info_request_msg, AgentState.INFO_GATHERING)
-        
-        # This should never happen, but just in case
-        return await self._send_response("I need some more information to check your order status. Could you provide both your order number and email address?", AgentState.INFO_GATHERING)
+        # Otherwise, look the order up while we wait for the email (if that's what is
+        # missing) and ask for the missing info
+        if order_number:
+            self._start_order_prefetch(order_number)
+        info_request_msg = MISSING_ORDER_INFO_MESSAGES[(bool(order_number), bool(email))].format(order_number=order_number, email=email)
+        return await self._send_response(info_request_msg, AgentState.INFO_GATHERING)
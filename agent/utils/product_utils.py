@@ -1,21 +1,73 @@
 from agent.services.products import get_all_products
 from agent.types import AgentState
+from agent.utils.openai_client import openai, openai_slots
+from agent.utils.agent_utils import _embed_text, EMBEDDING_MODEL, EMBEDDING_DIMENSIONS
+from agent.utils.intent_cache import normalize
+from agent.utils.prompts import PRODUCT_TURN_INSTRUCTIONS
+import asyncio
+import heapq
+import jiter
 import json
-from openai import AsyncOpenAI
-from typing import List, Dict, Any
 import os
-import dotenv
+from typing import List, Dict, Any, Optional, Tuple
+from pydantic import BaseModel
 
-dotenv.load_dotenv()
+class ProductTurn(BaseModel):
+    has_clear_question: bool
+    response: Optional[str]
 
-openai = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Catalogs larger than this are narrowed to the products whose embeddings best match the
+# customer's recent messages before prompting. Smaller catalogs are sent whole, which
+# needs no embedding calls and keeps the prompt stable
+PRODUCT_RETRIEVAL_TOP_K = int(os.getenv("PRODUCT_RETRIEVAL_TOP_K", "20"))
+
+# Normalized product embeddings keyed on the product text they were computed from
+_product_embeddings: Dict[str, List[float]] = {}
+
+def _product_embedding_text(product: Dict[str, Any]) -> str:
+    """Text describing a product for retrieval."""
+    return f"{product['ProductName']}\n{product['Description']}\n{' '.join(product['Tags'])}"
+
+async def _embed_products(products: List[Dict[str, Any]]) -> List[List[float]]:
+    """Embed products, reusing embeddings of unchanged products and batching the rest into one request."""
+    texts = [_product_embedding_text(product) for product in products]
+    missing = [text for text in dict.fromkeys(texts) if text not in _product_embeddings]
+    if missing:
+        async with openai_slots():
+            response = await openai.embeddings.create(
+                model=EMBEDDING_MODEL,
+                input=missing,
+                dimensions=EMBEDDING_DIMENSIONS
+            )
+        for item in response.data:
+            _product_embeddings[missing[item.index]] = normalize(item.embedding)
+    return [_product_embeddings[text] for text in texts]
+
+# Last catalog list serialized into the instructions, with the result. The products
+# service hands out the same list object until its cache refreshes, so most product
+# turns reuse the serialized prompt
+_last_product_instructions: Optional[Tuple[List[Dict[str, Any]], str]] = None
+
+def _product_turn_instructions(product_data: List[Dict[str, Any]]) -> str:
+    """
+    Product turn instructions with the catalog appended as compact JSON. Keys are
+    sorted so the same catalog always serializes to the same bytes.
+    """
+    global _last_product_instructions
+    if _last_product_instructions is not None and _last_product_instructions[0] is product_data:
+        return _last_product_instructions[1]
+    product_json = json.dumps(product_data, separators=(",", ":"), sort_keys=True)
+    instructions = f"{PRODUCT_TURN_INSTRUCTIONS}\nProduct catalog:\n{product_json}"
+    _last_product_instructions = (product_data, instructions)
+    return instructions
 
 class ProductUtilsMixin:
     async def _handle_product_info_gathering(self) -> str:
             """
             Simplified product information handling process.
-            1. Detects if there's a clear product question
-            2. If yes, passes the question and product catalog to an LLM to generate a response
+            1. Loads the product catalog
+            2. In one LLM call, detects if there's a clear product question and, if so,
+               answers it from the catalog
             3. If no products match, prompts user for more information
             
             Returns:
@@ -31,162 +83,112 @@ class ProductUtilsMixin:
                 print(f"Error loading product data from API: {e}")
                 error_msg = "I'm having trouble accessing our product information right now. Could you please try again later?"
                 return await self._send_response(error_msg, AgentState.INTENT_DETECTION)
-                
-            # Get recent conversation history
-            recent_messages = self._get_recent_conversation()
             
-            # Step 1: Detect if there's a clear product question
-            has_clear_question = await self._check_for_product_question()
+            # Check for a clear product question and match products in a single call
+            product_turn, streamed = await self._generate_product_turn(product_data)
             
-            if not has_clear_question:
+            if not product_turn.has_clear_question:
                 prompt_msg = "Please provide me more details about what you're looking for. I can help you find products!"
                 return await self._send_response(prompt_msg, AgentState.INFO_GATHERING)
             
-            # Step 2: Use LLM to match products and answer the question
-            response = await self._generate_product_matching_response(product_data)
-
-            # Step 3: If the response is empty, no products matched
-            if len(response) == 0:
+            # If the response is empty, no products matched
+            response = (product_turn.response or "").strip()
+            if len(response) <= 2:
                 no_match_msg = "I couldn't find any products matching your criteria. Could you please provide more details about what you're looking for? For example, what type of activity, features, or categories are important to you?"
                 return await self._send_response(no_match_msg, AgentState.INFO_GATHERING)
             
             # Return the response with state transition to INTENT_DETECTION
-            return await self._send_response(response, AgentState.INTENT_DETECTION)
+            return await self._send_response(response, AgentState.INTENT_DETECTION, streamed=streamed)
     
-    async def _check_for_product_question(self) -> bool:
+    async def _select_relevant_products(self, product_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
-        Check if the user has asked a clear product-related question
+        Narrow a large catalog to the PRODUCT_RETRIEVAL_TOP_K products most similar to the
+        customer's recent messages, keeping catalog order.
         
+        Args:
+            product_data: List of products from the catalog
+            
         Returns:
-            Boolean indicating if there's a clear product question
+            The relevant products, or the whole catalog if it is small or retrieval fails
         """
-        # Get recent conversation history
-        recent_conversation = self._get_recent_conversation()
-        
-        system_message = """
-        You are a specialized query intent classifier within Sierra Outfitters' AI customer service orchestration system.
-    
-        YOUR ROLE: Determine if the customer's conversation contains enough product-specific information to perform a product catalog search.
-        
-        IMPORTANT CONTEXT:
-        - You are analyzing an ongoing conversation, not isolated queries
-        - Customers may reference products mentioned earlier in the conversation
-        - The conversation has contextual continuity - information builds across messages
-        - Previous messages provide important context for understanding the current request
-        
-        CLASSIFICATION TASK:
-        Determine if the conversation contains enough information to search the product catalog effectively.
-        
-        EXAMPLES OF SEARCHABLE QUERIES:
-        - Direct product mentions: "Do you have hiking boots?"
-        - Product categories: "I'm looking for camping gear"
-        - Product attributes: "I need waterproof jackets"
-        - Products for types of people: "Do you have products for wizards?"
-        - Just product types: "protein bars"
-        - Follow-up specifics: "How many are in stock?" (when previously discussing a specific product)
-        - Implied references: "What other colors does it come in?" (referencing a previously mentioned product)
-        
-        ANSWER GUIDELINES:
-        - Answer "yes" if the conversation contains information to perform a catalog search, so if the customer has mentioned a product, a category, an attribute, or a follow-up question about a previously mentioned product.
-        - Answer "no" if the customer hasn't specified any product information that could be used for searching the catalog for the current request / context
-        - Consider the ENTIRE conversation context, not just the latest message. But, of course, the product searching context should be relevant to the intent of the customer's current request. 
-        - If the customer is asking follow-up questions about previously mentioned products, answer "yes". But, of course, the product searching context should be relevant to the intent of the customer's current request, otherwise answer "no". 
-        
-        Respond ONLY with "yes" or "no".
-        """      
+        if len(product_data) <= PRODUCT_RETRIEVAL_TOP_K:
+            return product_data
         
+        query = self._format_conversation_text(self._get_intent_messages())
         try:
-            response = await openai.responses.create(
-                model="gpt-4o",
-                instructions=system_message,
-                input=recent_conversation,
-                max_output_tokens=16,
-                temperature=0.25
-            )
-            
-            result = response.output_text.strip().lower()
-            return result == "yes"
-                
+            product_vectors, query_vector = await asyncio.gather(_embed_products(product_data), _embed_text(query))
         except Exception as e:
-            print(f"Error checking for product question: {e}")
-            # Default to yes if there's an error
-            return True
+            print(f"Error retrieving relevant products: {e}")
+            return product_data
+        
+        scores = [sum(a * b for a, b in zip(query_vector, vector)) for vector in product_vectors]
+        top = heapq.nlargest(PRODUCT_RETRIEVAL_TOP_K, range(len(product_data)), key=scores.__getitem__)
+        return [product_data[i] for i in sorted(top)]
     
-    async def _generate_product_matching_response(self, product_data: List[Dict[str, Any]]) -> str:
+    async def _generate_product_turn(self, product_data: List[Dict[str, Any]]) -> Tuple[ProductTurn, bool]:
         """
-        Generate a response based on matching products to the user's question.
+        Decide whether the customer asked a clear product question and, if so, generate a
+        response based on matching products to it. The response is streamed to the
+        customer as it is generated, once it is clearly not empty.
         
         Args:
             product_data: List of products from the catalog
             
         Returns:
-            Response message or empty string if no products match
+            The product turn (its response is empty if no products match and None if
+            there is no clear product question), and whether the response was streamed
         """
         # Get recent conversation history
         recent_conversation = self._get_recent_conversation()
         
-        # Format product data as JSON string
-        product_json = json.dumps(product_data, indent=2)
-        
-        model_input = f"""
-        Product catalog:
-        {product_json}
-
-        Customer Conversation:
-        {recent_conversation}
-        """
-
-        system_message = """
-        You are the product recommendation component within Sierra Outfitters' customer service AI orchestration system.
-        
-        YOUR ROLE: Generate helpful, accurate product information based on the customer's needs in the context of their ongoing conversation.
-        
-        IMPORTANT CONTEXT:
-        - You have access to the complete product catalog (provided below)
-        - You are analyzing an ongoing conversation with contextual history
-        - The customer may refer to information mentioned earlier in the conversation
-        - Your response will be delivered directly to the customer as part of a seamless experience
-        
-        RESPONSE GENERATION TASK:
-        1. Carefully analyze the entire conversation to understand what products the customer is interested in
-        2. Match their needs against the product catalog
-        3. Generate a helpful, personalized response about relevant products
+        # Only send the most relevant products of a large catalog
+        product_data = await self._select_relevant_products(product_data)
         
-        RESPONSE GUIDELINES:
-        - IMPORTANT: If NO products in the catalog match the customer's needs, return ONLY an empty string "". Make sure to return an empty string, not a message saying that no products were found. Do not include spaces or newlines.
-        - Never mention products that aren't in the provided catalog
-        - Be conversational and natural - you're continuing an ongoing dialogue
-        - Reference relevant details from the catalog (product names, SKUs, features, inventory)
-        - Include a brief, enthusiastic outdoor-themed comment relevant to the products (e.g., "These hiking boots are perfect for conquering mountain trails!"). Add a relevant outdoor-themed emoji as well.
-        - Always end by asking if they need further assistance
-        - Maintain continuity with the previous conversation - acknowledge information they've already shared
-        
-        Product catalog is provided in JSON format with the following fields:
-        - ProductName: The name of the product
-        - SKU: The unique product identifier
-        - Inventory: Number of items in stock
-        - Description: Detailed description of the product
-        - Tags: List of categories/features related to the product
-        """
+        # The catalog goes at the end of the instructions and the conversation is the only
+        # input, so the static instructions + catalog prefix is byte-identical across calls
+        # and can hit OpenAI's automatic prompt cache
+        instructions = _product_turn_instructions(product_data)
         
+        raw_output = ""
+        emitted = ""
         try:
-            response = await openai.responses.create(
+            async with openai_slots(), openai.responses.stream(
                 model="gpt-4o",
-                instructions=system_message,
-                input=model_input,
+                instructions=instructions,
+                input=recent_conversation,
                 max_output_tokens=512,
-                temperature=0.7
-            )
-            
-            result = response.output_text.strip()
-            
-            # If the result is empty, return an empty string
-            if len(result) <= 2:
-                return ""
+                # Low so the has_clear_question decision is stable for a given conversation
+                temperature=0.2,
+                text_format=ProductTurn
+            ) as stream:
+                async for event in stream:
+                    if event.type != "response.output_text.delta":
+                        continue
+                    raw_output += event.delta
+                    
+                    # Parse the JSON generated so far; the partial response string grows
+                    # with each delta. Short responses are held back since they mean no match
+                    partial = jiter.from_json(raw_output.encode("utf-8"), partial_mode="trailing-strings")
+                    if partial.get("has_clear_question") is not True:
+                        continue
+                    response_text = (partial.get("response") or "").lstrip()
+                    if len(response_text.rstrip()) > 2 and response_text.startswith(emitted):
+                        self._emit(response_text[len(emitted):])
+                        emitted = response_text
                 
-            return result
+                response = await stream.get_final_response()
+            
+            # output_parsed is None only if the model refused to answer
+            if response.output_parsed is None:
+                return ProductTurn(has_clear_question=True, response=emitted), bool(emitted)
+            return response.output_parsed, bool(emitted)
                 
         except Exception as e:
             print(f"Error generating product matching response: {e}")
-            # Return an error message instead of empty string
-            return "I found some products that might interest you, but I'm having trouble retrieving the details right now. Can you please try again?"
\ No newline at end of file
+            # Return an error message instead of an empty response
+            error_msg = "I found some products that might interest you, but I'm having trouble retrieving the details right now. Can you please try again?"
+            if emitted:
+                # Part of the answer already reached the customer, so finish it with the error
+                self._emit(f"\n\n{error_msg}")
+                return ProductTurn(has_clear_question=True, response=f"{emitted}\n\n{error_msg}"), True
+            return ProductTurn(has_clear_question=True, response=error_msg), False
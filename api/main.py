@@ -1,12 +1,22 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from api.routes import products, orders
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load and index the product and order data at startup rather than on the first request."""
+    products.load_product_indexes()
+    products.load_products_by_sku()
+    orders.load_order_indexes()
+    yield
+
 app = FastAPI(
     title="Sierra Outfitters API",
     description="API for Sierra Outfitters product catalog and order tracking",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # Add CORS middleware
@@ -14,4 +14,5 @@ class OrderResponse(BaseModel):
 
 class OrderSearchParams(BaseModel):
     customer_email: Optional[str] = None
-    order_number: Optional[str] = None
\ No newline at end of file
+    order_number: Optional[str] = None
+    tracking_number: Optional[str] = None
\ No newline at end of file
@@ -1,6 +1,7 @@
+import functools
 import json
 from fastapi import APIRouter, HTTPException
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 import os
 
 from api.models.order import Order, OrderResponse
@@ -12,28 +13,76 @@ router = APIRouter(prefix="/orders", tags=["orders"])
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
 DATA_PATH = os.path.join(BASE_DIR, "data", "CustomerOrders.json")
 
+@functools.lru_cache(maxsize=1)
+def _load_orders_cached(mtime_ns: int):
+    """Parse the data file; cached per modification time, so edits to the file are picked up."""
+    with open(DATA_PATH, "r") as f:
+        return json.load(f)
+
 def load_orders():
     try:
-        with open(DATA_PATH, "r") as f:
-            return json.load(f)
+        return _load_orders_cached(os.stat(DATA_PATH).st_mtime_ns)
     except Exception as e:
         print(f"Error loading order data: {e}")
         return []
 
-@router.get("/", response_model=OrderResponse)
-def get_orders(
+@functools.lru_cache(maxsize=1)
+def _index_orders(mtime_ns: int):
+    """
+    Index the orders by order number, tracking number, and lowercased email.
+    Cached per modification time alongside the parsed data.
+    """
+    by_number, by_tracking, by_email = {}, {}, {}
+    for order in _load_orders_cached(mtime_ns):
+        by_number.setdefault(order["OrderNumber"], []).append(order)
+        if order.get("TrackingNumber"):
+            by_tracking.setdefault(order["TrackingNumber"], []).append(order)
+        by_email.setdefault(order["Email"].lower(), []).append(order)
+    return by_number, by_tracking, by_email
+
+def load_order_indexes():
+    try:
+        return _index_orders(os.stat(DATA_PATH).st_mtime_ns)
+    except Exception as e:
+        print(f"Error loading order data: {e}")
+        return {}, {}, {}
+
+def find_orders(
     customer_email: Optional[str] = None,
-    order_number: Optional[str] = None
-):
+    order_number: Optional[str] = None,
+    tracking_number: Optional[str] = None
+) -> List[Dict[str, Any]]:
     """
-    Get all orders with optional filtering
+    Find the orders matching the optional filters.
+    Used by the endpoint below and directly by an agent running in-process.
     """
-    orders = load_orders()
+    # Start from the most selective index, then apply the remaining filters
+    if order_number or tracking_number or customer_email:
+        by_number, by_tracking, by_email = load_order_indexes()
+        if order_number:
+            orders = by_number.get(order_number, [])
+        elif tracking_number:
+            orders = by_tracking.get(tracking_number, [])
+        else:
+            orders = by_email.get(customer_email.lower(), [])
+    else:
+        orders = load_orders()
     
     if customer_email:
         orders = [o for o in orders if o["Email"].lower() == customer_email.lower()]
     
-    if order_number:
-        orders = [o for o in orders if o["OrderNumber"] == order_number]
+    if tracking_number:
+        orders = [o for o in orders if o.get("TrackingNumber") == tracking_number]
         
-    return {"orders": orders}
\ No newline at end of file
+    return orders
+
+@router.get("/", response_model=OrderResponse)
+def get_orders(
+    customer_email: Optional[str] = None,
+    order_number: Optional[str] = None,
+    tracking_number: Optional[str] = None
+):
+    """
+    Get all orders with optional filtering
+    """
+    return {"orders": find_orders(customer_email, order_number, tracking_number)}
@@ -1,6 +1,8 @@
+import bisect
+import functools
 import json
 from fastapi import APIRouter, HTTPException, Query
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 import os
 
 from api.models.products import Product, ProductResponse
@@ -10,37 +12,102 @@ router = APIRouter(prefix="/products", tags=["products"])
 # Load product data
 DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "ProductCatalog.json")
 
+@functools.lru_cache(maxsize=1)
+def _load_products_cached(mtime_ns: int):
+    """Parse the data file; cached per modification time, so edits to the file are picked up."""
+    with open(DATA_PATH, "r") as f:
+        return json.load(f)
+
 def load_products():
     try:
-        with open(DATA_PATH, "r") as f:
-            return json.load(f)
+        return _load_products_cached(os.stat(DATA_PATH).st_mtime_ns)
     except Exception as e:
         print(f"Error loading product data: {e}")
         return []
 
-@router.get("/", response_model=ProductResponse)
-def get_products(
+@functools.lru_cache(maxsize=1)
+def _index_products(mtime_ns: int):
+    """
+    Build the search structures for the catalog, cached per modification time alongside
+    the parsed data: a tag -> product positions index, a lowercased search text per
+    product, and product positions sorted by inventory with their inventories.
+    """
+    products = _load_products_cached(mtime_ns)
+    tag_index = {}
+    for i, product in enumerate(products):
+        for tag in product["Tags"]:
+            tag_index.setdefault(tag, set()).add(i)
+    search_texts = ["\n".join((p["ProductName"], p["Description"], p["SKU"])).lower() for p in products]
+    by_inventory = sorted(range(len(products)), key=lambda i: products[i]["Inventory"])
+    inventories = [products[i]["Inventory"] for i in by_inventory]
+    return products, tag_index, search_texts, by_inventory, inventories
+
+def load_product_indexes():
+    try:
+        return _index_products(os.stat(DATA_PATH).st_mtime_ns)
+    except Exception as e:
+        print(f"Error loading product data: {e}")
+        return [], {}, [], [], []
+
+@functools.lru_cache(maxsize=1)
+def _index_products_by_sku(mtime_ns: int):
+    """Map each SKU to its product, cached per modification time alongside the parsed data."""
+    return {product["SKU"]: product for product in _load_products_cached(mtime_ns)}
+
+def load_products_by_sku():
+    try:
+        return _index_products_by_sku(os.stat(DATA_PATH).st_mtime_ns)
+    except Exception as e:
+        print(f"Error loading product data: {e}")
+        return {}
+
+def find_products(
     query: Optional[str] = None,
-    tags: Optional[List[str]] = Query(None),
+    tags: Optional[List[str]] = None,
     min_inventory: Optional[int] = None
-):
+) -> List[Dict[str, Any]]:
     """
-    Get all products with optional filtering
+    Find the catalog products matching the optional filters.
+    Used by the endpoint below and directly by an agent running in-process.
     """
-    products = load_products()
+    products, tag_index, search_texts, by_inventory, inventories = load_product_indexes()
     
-    if query:
-        query = query.lower()
-        products = [p for p in products if (
-            query in p["ProductName"].lower() or 
-            query in p["Description"].lower() or
-            query in p["SKU"].lower()
-        )]
+    # Positions of the matching products; None while no filter has been applied
+    matches = None
     
     if tags:
-        products = [p for p in products if any(tag in p["Tags"] for tag in tags)]
+        matches = set().union(*(tag_index.get(tag, ()) for tag in tags))
     
     if min_inventory is not None:
-        products = [p for p in products if p["Inventory"] >= min_inventory]
-        
-    return {"products": products}
\ No newline at end of file
+        in_stock = set(by_inventory[bisect.bisect_left(inventories, min_inventory):])
+        matches = in_stock if matches is None else matches & in_stock
+    
+    if query:
+        query = query.lower()
+        candidates = range(len(products)) if matches is None else matches
+        matches = {i for i in candidates if query in search_texts[i]}
+    
+    if matches is None:
+        return products
+    return [products[i] for i in sorted(matches)]
+
+@router.get("/", response_model=ProductResponse)
+def get_products(
+    query: Optional[str] = None,
+    tags: Optional[List[str]] = Query(None),
+    min_inventory: Optional[int] = None
+):
+    """
+    Get all products with optional filtering
+    """
+    return {"products": find_products(query, tags, min_inventory)}
+
+@router.get("/{sku}", response_model=Product)
+def get_product(sku: str):
+    """
+    Get a single product by SKU
+    """
+    product = load_products_by_sku().get(sku)
+    if product is None:
+        raise HTTPException(status_code=404, detail=f"Product {sku} not found")
+    return product
@@ -1,5 +1,6 @@
 import os
 import asyncio
+import threading
 import dotenv
 import typer
 import uvicorn
@@ -11,10 +12,47 @@ from rich import print as rprint
 
 from api.main import app as api_app
 from agent import SierraAgent
+from agent.services.api_client import close_client
+
+# uvloop is optional: use its faster event loop for the chat session when installed
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
 
 # Load environment variables
 dotenv.load_dotenv()
 
+async def read_input(prompt, *args) -> str:
+    """
+    Run a blocking prompt on a daemon thread, so background tasks keep running while the
+    user types. Unlike asyncio.to_thread, an unfinished read doesn't hold up exit on Ctrl+C.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def resolve(result=None, error=None):
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def read():
+        try:
+            result, error = prompt(*args), None
+        except Exception as e:
+            result, error = None, e
+        try:
+            loop.call_soon_threadsafe(resolve, result, error)
+        except RuntimeError:
+            # The event loop already closed
+            pass
+
+    threading.Thread(target=read, daemon=True).start()
+    return await future
+
 # Create Typer app
 app = typer.Typer(help="Sierra Outfitters Agent")
 console = Console()
@@ -28,39 +66,79 @@ def api(port: int = 8000, host: str = "127.0.0.1"):
     uvicorn.run(api_app, host=host, port=port)
 
 @app.command()
-def chat():
+def chat(plain: bool = typer.Option(False, "--plain", help="Plain input/print loop without Rich formatting or spinners")):
     """
     Start an interactive chat session with the Sierra Agent
     """
-    rprint(Panel.fit(
-        "[bold blue]Sierra Outfitters Customer Service Agent[/bold blue]",
-        title="Sierra Agent",
-        border_style="blue"
-    ))
+    if plain:
+        print("Sierra Outfitters Customer Service Agent")
+    else:
+        rprint(Panel.fit(
+            "[bold blue]Sierra Outfitters Customer Service Agent[/bold blue]",
+            title="Sierra Agent",
+            border_style="blue"
+        ))
     
     async def chat_loop():
         agent = SierraAgent()
         
         # Get and display welcome message (agent starts in WELCOME state)
-        with console.status("[bold yellow]Initializing...[/bold yellow]", spinner="dots"):
+        if plain:
             welcome_message = await agent.process_message("")
+            print(f"\nSierra Agent: {welcome_message}")
+        else:
+            with console.status("[bold yellow]Initializing...[/bold yellow]", spinner="dots"):
+                welcome_message = await agent.process_message("")
+            rprint(f"\n[bold blue]Sierra Agent[/bold blue]: {welcome_message}")
         
-        rprint(f"\n[bold blue]Sierra Agent[/bold blue]: {welcome_message}")
-        
-        while True:
-            user_input = Prompt.ask("\n[bold cyan]You[/bold cyan]")
-            
-            if user_input.lower() in ["exit", "quit", "bye"]:
-                rprint("[bold green]Thank you for chatting with Sierra Agent. Goodbye![/bold green]")
-                break
-            
-            with console.status("[bold yellow]Thinking...[/bold yellow]", spinner="dots"):
-                response = await agent.process_message(user_input)
-            
-            rprint(f"\n[bold blue]Sierra Agent[/bold blue]: {response}")
+        try:
+            while True:
+                # Read input off the event loop so background tasks (order prefetch, history
+                # summaries) keep running while the user types
+                if plain:
+                    user_input = await read_input(input, "\nYou: ")
+                else:
+                    user_input = await read_input(Prompt.ask, "\n[bold cyan]You[/bold cyan]")
+                
+                if user_input.lower() in ["exit", "quit", "bye"]:
+                    if plain:
+                        print("Thank you for chatting with Sierra Agent. Goodbye!")
+                    else:
+                        rprint("[bold green]Thank you for chatting with Sierra Agent. Goodbye![/bold green]")
+                    break
+                
+                if plain:
+                    # A single placeholder line, overwritten by the first chunk of the response
+                    print("...", end="\r", flush=True)
+                    first_chunk = True
+                    async for chunk in agent.stream_message(user_input):
+                        if first_chunk:
+                            print("Sierra Agent: ", end="")
+                            first_chunk = False
+                        print(chunk, end="", flush=True)
+                    print()
+                    continue
+                
+                # Show the spinner until the first chunk of the response arrives
+                status = console.status("[bold yellow]Thinking...[/bold yellow]", spinner="dots")
+                status.start()
+                try:
+                    first_chunk = True
+                    async for chunk in agent.stream_message(user_input):
+                        if first_chunk:
+                            status.stop()
+                            rprint("\n[bold blue]Sierra Agent[/bold blue]: ", end="")
+                            first_chunk = False
+                        console.print(chunk, end="", markup=False)
+                finally:
+                    status.stop()
+                console.print()
+        finally:
+            await close_client()
     
     # Run the chat loop
-    asyncio.run(chat_loop())
+    run = uvloop.run if uvloop else asyncio.run
+    run(chat_loop())
 
 @app.command()
 def env_check():